@@ -38,4 +38,5 @@ def calc_wc(T,V):
 
 from .forecast import Forecast
 from .fiveday_forecast import FiveDayForecast
+from .alerts import AlertEngine
 from resources import tts
\ No newline at end of file
@@ -0,0 +1,321 @@
+from .fiveday_forecast import parse_slot
+
+from datetime import datetime, timedelta
+import sqlite3
+
+FIELDS = (
+    'temp_avg', 'temp_hi', 'temp_lo', 'humidity', 'clouds', 'wind',
+    'rain', 'snow', 'wind_chill', 'heat_index', 'apparent_temp'
+)
+
+OPERATORS = ('>', '>=', '<', '<=', '=', '!=')
+
+TIMES_OF_DAY = {
+    'morning': (1, 11),
+    'afternoon': (12, 15),
+    'evening': (16, 18),
+    'night': (19, 23)
+}
+
+
+def is_number(val):
+    return isinstance(val, (int, float)) and not isinstance(val, bool)
+
+
+class AlertEngine():
+    '''
+    Evaluates declarative threshold rules against many forecasts at once.
+
+    Every forecast slot is stored as one row per weather field, so a single
+    join against the rules table checks all rules against all forecasts in
+    one pass. Triggered (rule, forecast) pairs are remembered between calls
+    and only changes are returned.
+
+    A rule is a dict such as:
+        {"id": "windy", "field": "wind", "op": ">", "value": 30, "hours": 24}
+        {"id": "snow-am", "field": "snow", "op": ">", "value": 0,
+            "day": 1, "time_of_day": "morning"}
+        {"id": "cold", "field": "apparent_temp", "op": "<", "value": 10,
+            "consecutive": 3}
+
+    The window is either the next "hours", or a "day" offset from today
+    optionally narrowed to a "time_of_day". Without either it covers the
+    next five days.
+    '''
+
+    def __init__(self, rules=None):
+        self.cnx = sqlite3.connect(":memory:")
+        self.cnx.execute('''
+            CREATE TABLE slots(
+                forecast_id     TEXT,
+                slot            INT,
+                dt              TIMESTAMP,
+                field           TEXT,
+                val             FLOAT
+            );''')
+        self.cnx.execute(
+            "CREATE INDEX slots_forecast ON slots(forecast_id, field, dt);")
+        self.cnx.execute('''
+            CREATE TABLE rules(
+                rule_id         TEXT PRIMARY KEY,
+                field           TEXT,
+                op              TEXT,
+                threshold       FLOAT,
+                hours           FLOAT,
+                day             INT,
+                time_of_day     TEXT,
+                consecutive     INT,
+                start_dt        TIMESTAMP,
+                end_dt          TIMESTAMP
+            );''')
+        self.cnx.execute('''
+            CREATE TABLE alerts(
+                rule_id         TEXT,
+                forecast_id     TEXT,
+                dt              TIMESTAMP,
+                PRIMARY KEY (rule_id, forecast_id)
+            );''')
+        self.cnx.execute(
+            "CREATE INDEX alerts_forecast ON alerts(forecast_id);")
+        self.cnx.execute('''
+            CREATE TABLE hits(
+                rule_id         TEXT,
+                forecast_id     TEXT,
+                dt              TIMESTAMP
+            );''')
+        self.cnx.commit()
+
+        if rules is not None:
+            for rule in rules:
+                self.add_rule(rule)
+
+    def __del__(self):
+        self.cnx.close()
+        del self.cnx
+
+    #########
+    # RULES #
+    #########
+    def add_rule(self, rule):
+        if rule.get('id') is None:
+            raise ValueError("rule requires an id")
+
+        field = rule.get('field')
+        op = rule.get('op')
+        value = rule.get('value')
+        hours = rule.get('hours')
+        day = rule.get('day')
+        time_of_day = rule.get('time_of_day')
+        consecutive = rule.get('consecutive', 1)
+
+        if field not in FIELDS:
+            raise ValueError(f"unknown field '{field}'")
+        if op not in OPERATORS:
+            raise ValueError(f"unknown operator '{op}'")
+        if not is_number(value):
+            raise ValueError("value must be a number")
+        if hours is not None and not is_number(hours):
+            raise ValueError("hours must be a number")
+        if day is not None and not (is_number(day) and isinstance(day, int)):
+            raise ValueError("day must be a whole number")
+        if not (is_number(consecutive) and isinstance(consecutive, int)):
+            raise ValueError("consecutive must be a whole number")
+        if time_of_day is not None and time_of_day not in TIMES_OF_DAY:
+            raise ValueError(f"unknown time of day '{time_of_day}'")
+        if time_of_day is not None and day is None:
+            raise ValueError("time_of_day requires day")
+        if hours is not None and day is not None:
+            raise ValueError("hours and day cannot be combined")
+        if hours is not None and hours < 0:
+            raise ValueError("hours cannot be negative")
+        if day is not None and day < 0:
+            raise ValueError("day cannot be negative")
+        if consecutive < 1:
+            raise ValueError("consecutive must be at least 1")
+
+        self.cnx.execute('''
+            INSERT OR REPLACE INTO rules(
+                rule_id, field, op, threshold, hours, day,
+                time_of_day, consecutive
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        ''', (rule['id'], field, op, value, hours, day,
+              time_of_day, consecutive))
+        self.cnx.commit()
+
+    def remove_rule(self, rule_id):
+        cleared = self.cnx.execute('''
+            SELECT
+                rule_id, forecast_id,
+                DATETIME(dt,\'unixepoch\',\'localtime\')
+            FROM alerts
+            WHERE rule_id=?
+        ''', (rule_id,)).fetchall()
+
+        self.cnx.execute("DELETE FROM rules WHERE rule_id=?;", (rule_id,))
+        self.cnx.execute("DELETE FROM alerts WHERE rule_id=?;", (rule_id,))
+        self.cnx.commit()
+
+        return [
+            {"rule": res[0], "forecast": res[1], "dt": res[2]}
+            for res in cleared
+        ]
+
+    def __rule_window(self, hours, day, time_of_day, now):
+        if day is None and hours is None:
+            return (now.timestamp(), (now + timedelta(days=5)).timestamp())
+
+        if day is None:
+            return (now.timestamp(), (now + timedelta(hours=hours)).timestamp())
+
+        date = now.replace(minute=0, second=0, microsecond=0) \
+            + timedelta(days=day)
+        if time_of_day is None:
+            start = date.replace(hour=0)
+            end = date.replace(hour=23, minute=59, second=59)
+        else:
+            hour_start, hour_end = TIMES_OF_DAY[time_of_day]
+            start = date.replace(hour=hour_start)
+            end = date.replace(hour=hour_end)
+
+        return (start.timestamp(), end.timestamp())
+
+    def __resolve_windows(self, now):
+        now = datetime.today() if now is None else now
+        rules = self.cnx.execute(
+            "SELECT rule_id, hours, day, time_of_day FROM rules;").fetchall()
+        self.cnx.executemany(
+            "UPDATE rules SET start_dt=?, end_dt=? WHERE rule_id=?;",
+            [
+                (*self.__rule_window(r[1], r[2], r[3], now), r[0])
+                for r in rules
+            ])
+
+    #############
+    # FORECASTS #
+    #############
+    def add_forecast(self, forecast_id, forecast):
+        days = sorted(
+            (parse_slot(data) for data in forecast['forecast']['list']),
+            key=lambda slot: slot[0])
+
+        self.cnx.execute(
+            "DELETE FROM slots WHERE forecast_id=?;", (forecast_id,))
+        self.cnx.executemany('''
+            INSERT INTO slots(forecast_id, slot, dt, field, val)
+            VALUES (?, ?, ?, ?, ?);
+        ''', [
+            (forecast_id, i, slot[0], field, val)
+            for i, slot in enumerate(days)
+            for field, val in zip(FIELDS, slot[1:])
+        ])
+        self.cnx.commit()
+
+    def remove_forecast(self, forecast_id):
+        self.cnx.execute(
+            "DELETE FROM slots WHERE forecast_id=?;", (forecast_id,))
+        result = self.__diff(forecast_id)
+        self.cnx.commit()
+        return result["cleared"]
+
+    def update_forecast(self, forecast_id, forecast, now=None):
+        self.add_forecast(forecast_id, forecast)
+        return self.evaluate(now, forecast_id)
+
+    ##############
+    # EVALUATION #
+    ##############
+    def evaluate(self, now=None, forecast_id=None):
+        self.__resolve_windows(now)
+        result = self.__diff(forecast_id)
+        self.cnx.commit()
+        return result
+
+    def __diff(self, forecast_id):
+        where = "" if forecast_id is None else "AND s.forecast_id=:forecast_id"
+        scope = "" if forecast_id is None else "WHERE forecast_id=:forecast_id"
+        params = {"forecast_id": forecast_id}
+
+        # Runs of matching slots are found by subtracting each match's rank
+        # from its slot index: consecutive slots share the same difference.
+        query = '''
+            WITH matches AS (
+                SELECT r.rule_id, s.forecast_id, s.slot, s.dt
+                FROM slots s
+                JOIN rules r ON s.field = r.field
+                WHERE
+                    s.dt BETWEEN r.start_dt AND r.end_dt
+                    AND CASE r.op
+                        WHEN '>' THEN s.val > r.threshold
+                        WHEN '>=' THEN s.val >= r.threshold
+                        WHEN '<' THEN s.val < r.threshold
+                        WHEN '<=' THEN s.val <= r.threshold
+                        WHEN '=' THEN s.val = r.threshold
+                        WHEN '!=' THEN s.val != r.threshold
+                    END
+                    {}
+            ), runs AS (
+                SELECT
+                    rule_id, forecast_id, dt,
+                    slot - ROW_NUMBER() OVER (
+                        PARTITION BY rule_id, forecast_id ORDER BY slot
+                    ) AS run
+                FROM matches
+            ), triggered AS (
+                SELECT runs.rule_id, forecast_id, MIN(dt) AS dt
+                FROM runs
+                JOIN rules USING(rule_id)
+                GROUP BY runs.rule_id, forecast_id, run
+                HAVING COUNT(*) >= MAX(rules.consecutive)
+            )
+            INSERT INTO hits
+            SELECT rule_id, forecast_id, MIN(dt)
+            FROM triggered
+            GROUP BY rule_id, forecast_id
+        '''.format(where)
+
+        self.cnx.execute("DELETE FROM hits;")
+        self.cnx.execute(query, params)
+
+        triggered = self.cnx.execute('''
+            SELECT
+                h.rule_id, h.forecast_id,
+                DATETIME(h.dt,\'unixepoch\',\'localtime\')
+            FROM hits h
+            LEFT JOIN alerts a USING(rule_id, forecast_id)
+            WHERE a.rule_id IS NULL
+        ''').fetchall()
+
+        cleared = self.cnx.execute('''
+            SELECT
+                a.rule_id, a.forecast_id,
+                DATETIME(a.dt,\'unixepoch\',\'localtime\')
+            FROM (SELECT * FROM alerts {}) a
+            LEFT JOIN hits h USING(rule_id, forecast_id)
+            WHERE h.rule_id IS NULL
+        '''.format(scope), params).fetchall()
+
+        self.cnx.execute("DELETE FROM alerts {};".format(scope), params)
+        self.cnx.execute("INSERT INTO alerts SELECT * FROM hits;")
+
+        return {
+            "triggered": [
+                {"rule": res[0], "forecast": res[1], "dt": res[2]}
+                for res in triggered
+            ],
+            "cleared": [
+                {"rule": res[0], "forecast": res[1], "dt": res[2]}
+                for res in cleared
+            ]
+        }
+
+    def active_alerts(self):
+        results = self.cnx.execute('''
+            SELECT
+                rule_id, forecast_id,
+                DATETIME(dt,\'unixepoch\',\'localtime\')
+            FROM alerts
+        ''').fetchall()
+        return [
+            {"rule": res[0], "forecast": res[1], "dt": res[2]}
+            for res in results
+        ]
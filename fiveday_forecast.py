@@ -8,6 +8,29 @@ import sqlite3
 import json
 
 
+def parse_slot(data):
+    date = datetime.strptime(
+        data['dt_txt'], "%Y-%m-%d %X").timestamp()
+    temp_avg = data['main']['temp']
+    temp_hi = data['main']['temp_max']
+    temp_lo = data['main']['temp_min']
+    humidity = data['main']['humidity']
+    clouds = data['clouds']['all']
+    wind = data['wind']['speed']
+    rain = 0 if 'rain' not in data else data['rain']
+    if isinstance(rain, dict):
+        rain = 0 if '3h' not in rain else rain['3h']
+    snow = 0 if 'snow' not in data else data['snow']
+    if isinstance(snow, dict):
+        snow = 0 if '3h' not in snow else snow['3h']
+    wind_chill = calc_wc(temp_avg,wind)
+    heat_index = calc_hi(temp_avg,humidity)
+    apparent_temp = calc_apparent_temp(temp_avg,humidity,wind)
+
+    return (date, temp_avg, temp_hi, temp_lo, humidity, clouds, wind,
+        rain, snow, wind_chill, heat_index, apparent_temp)
+
+
 class FiveDayForecast():
     def __init__(self, forecast=None):
         self.cnx = sqlite3.connect(":memory:")
@@ -43,24 +66,6 @@ class FiveDayForecast():
         days = forecast['forecast']['list']
         try:
             for data in days:
-                date = datetime.strptime(
-                    data['dt_txt'], "%Y-%m-%d %X").timestamp()
-                temp_avg = data['main']['temp']
-                temp_hi = data['main']['temp_max']
-                temp_lo = data['main']['temp_min']
-                humidity = data['main']['humidity']
-                clouds = data['clouds']['all']
-                wind = data['wind']['speed']
-                rain = 0 if 'rain' not in data else data['rain']
-                if isinstance(rain, dict):
-                    rain = 0 if '3h' not in rain else rain['3h']
-                snow = 0 if 'snow' not in data else data['snow']
-                if isinstance(snow, dict):
-                    snow = 0 if '3h' not in snow else snow['3h']
-                wind_chill = calc_wc(temp_avg,wind)
-                heat_index = calc_hi(temp_avg,humidity)
-                apparent_temp = calc_apparent_temp(temp_avg,humidity,wind)
-
                 query = ''' 
                     INSERT INTO weather(
                         dt, temp_avg, temp_hi, temp_lo, humidity,
@@ -69,8 +74,7 @@ class FiveDayForecast():
                     ) VALUES (
                         {}, {}, {}, {}, {}, {}, {}, {}, {}, {}, {}, {}
                     );
-                '''.format(date, temp_avg, temp_hi, temp_lo, humidity, clouds, wind, 
-                    rain, snow, wind_chill, heat_index, apparent_temp)
+                '''.format(*parse_slot(data))
 
                 self.cnx.execute(query)
 
@@ -0,0 +1,193 @@
+from .alerts import AlertEngine
+
+from datetime import datetime, timedelta
+import pytest
+
+NOW = datetime(2026, 10, 19, 6, 0)
+
+
+def make_forecast(temp=50, wind=5, snow=0):
+    '''
+    Builds a five day forecast of 3h slots starting at NOW. Each of temp,
+    wind and snow is either a constant or a dict of {slot index: value}
+    overriding the default for those slots.
+    '''
+    def value(spec, i, default):
+        if isinstance(spec, dict):
+            return spec.get(i, default)
+        return spec
+
+    slots = []
+    for i in range(40):
+        dt = NOW + timedelta(hours=3 * i)
+        slots.append({
+            "dt_txt": dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "main": {
+                "temp": value(temp, i, 50),
+                "temp_max": 55,
+                "temp_min": 45,
+                "humidity": 50
+            },
+            "clouds": {"all": 20},
+            "wind": {"speed": value(wind, i, 5)},
+            "snow": {"3h": value(snow, i, 0)}
+        })
+
+    return {"forecast": {"list": slots}}
+
+
+def keys(alerts):
+    return sorted((a["rule"], a["forecast"]) for a in alerts)
+
+
+WINDY = {"id": "windy", "field": "wind", "op": ">", "value": 30, "hours": 24}
+SNOW_AM = {"id": "snow-am", "field": "snow", "op": ">", "value": 0,
+           "day": 1, "time_of_day": "morning"}
+COLD = {"id": "cold", "field": "apparent_temp", "op": "<", "value": 10,
+        "consecutive": 3}
+
+
+def test_hours_window():
+    engine = AlertEngine([WINDY])
+    # slot 2 is 12:00 today, slot 10 is 12:00 tomorrow (outside 24h)
+    engine.add_forecast("inside", make_forecast(wind={2: 40}))
+    engine.add_forecast("outside", make_forecast(wind={10: 40}))
+
+    result = engine.evaluate(NOW)
+    assert keys(result["triggered"]) == [("windy", "inside")]
+    assert result["triggered"][0]["dt"] == "2026-10-19 12:00:00"
+    assert result["cleared"] == []
+
+
+def test_day_and_time_of_day_window():
+    engine = AlertEngine([SNOW_AM])
+    # slot 9 is 09:00 tomorrow, slot 13 is 21:00 tomorrow, slot 1 is today
+    engine.add_forecast("morning", make_forecast(snow={9: 1}))
+    engine.add_forecast("night", make_forecast(snow={13: 1}))
+    engine.add_forecast("today", make_forecast(snow={1: 1}))
+
+    result = engine.evaluate(NOW)
+    assert keys(result["triggered"]) == [("snow-am", "morning")]
+
+
+def test_consecutive_slots():
+    engine = AlertEngine([COLD])
+    engine.add_forecast("run", make_forecast(temp={4: 0, 5: 0, 6: 0}))
+    engine.add_forecast("short", make_forecast(temp={1: 0, 2: 0, 4: 0}))
+
+    result = engine.evaluate(NOW)
+    assert keys(result["triggered"]) == [("cold", "run")]
+    assert result["triggered"][0]["dt"] == "2026-10-19 18:00:00"
+
+
+def test_unchanged_forecast_reports_nothing():
+    engine = AlertEngine([WINDY])
+    engine.add_forecast("a", make_forecast(wind={2: 40}))
+
+    engine.evaluate(NOW)
+    assert engine.evaluate(NOW) == {"triggered": [], "cleared": []}
+    assert keys(engine.active_alerts()) == [("windy", "a")]
+
+
+def test_update_breaks_consecutive_run():
+    engine = AlertEngine([COLD])
+    engine.add_forecast("a", make_forecast(temp={4: 0, 5: 0, 6: 0}))
+    engine.evaluate(NOW)
+
+    result = engine.update_forecast(
+        "a", make_forecast(temp={4: 0, 5: 50, 6: 0}), NOW)
+    assert result["triggered"] == []
+    assert keys(result["cleared"]) == [("cold", "a")]
+    assert engine.active_alerts() == []
+
+
+def test_update_is_scoped_to_one_forecast():
+    engine = AlertEngine([WINDY])
+    engine.add_forecast("a", make_forecast(wind={2: 40}))
+    engine.add_forecast("b", make_forecast(wind={2: 40}))
+    engine.evaluate(NOW)
+
+    result = engine.update_forecast("a", make_forecast(), NOW)
+    assert keys(result["cleared"]) == [("windy", "a")]
+    assert result["triggered"] == []
+    assert keys(engine.active_alerts()) == [("windy", "b")]
+
+    result = engine.update_forecast("a", make_forecast(wind={3: 40}), NOW)
+    assert keys(result["triggered"]) == [("windy", "a")]
+    assert result["cleared"] == []
+
+
+def test_remove_forecast_clears_its_alerts():
+    engine = AlertEngine([WINDY])
+    engine.add_forecast("a", make_forecast(wind={2: 40}))
+    engine.add_forecast("b", make_forecast(wind={2: 40}))
+    engine.evaluate(NOW)
+
+    assert keys(engine.remove_forecast("a")) == [("windy", "a")]
+    assert keys(engine.active_alerts()) == [("windy", "b")]
+
+
+def test_replaced_rule_reports_clear():
+    engine = AlertEngine([WINDY])
+    engine.add_forecast("a", make_forecast(wind={2: 40}))
+    engine.evaluate(NOW)
+
+    engine.add_rule(dict(WINDY, value=50))
+    result = engine.evaluate(NOW)
+    assert result["triggered"] == []
+    assert keys(result["cleared"]) == [("windy", "a")]
+
+
+def test_replaced_rule_still_matching_is_silent():
+    engine = AlertEngine([WINDY])
+    engine.add_forecast("a", make_forecast(wind={2: 40}))
+    engine.evaluate(NOW)
+
+    engine.add_rule(dict(WINDY, value=35))
+    assert engine.evaluate(NOW) == {"triggered": [], "cleared": []}
+    assert keys(engine.active_alerts()) == [("windy", "a")]
+
+
+def test_remove_rule_returns_cleared_alerts():
+    engine = AlertEngine([WINDY, COLD])
+    engine.add_forecast("a", make_forecast(wind={2: 40}))
+    engine.add_forecast("b", make_forecast(wind={2: 40}))
+    engine.evaluate(NOW)
+
+    cleared = engine.remove_rule("windy")
+    assert keys(cleared) == [("windy", "a"), ("windy", "b")]
+    assert cleared[0]["dt"] == "2026-10-19 12:00:00"
+    assert engine.active_alerts() == []
+    assert engine.evaluate(NOW) == {"triggered": [], "cleared": []}
+
+
+@pytest.mark.parametrize("rule", [
+    {"field": "fog"},
+    {"op": "~"},
+    {"time_of_day": "noon", "day": 0},
+    {"time_of_day": "morning"},
+    {"hours": 24, "day": 1},
+    {"hours": -1},
+    {"day": -1},
+    {"consecutive": 0},
+    {"id": None},
+    {"value": None},
+    {"value": "30"},
+    {"hours": "24"},
+    {"day": "1"},
+    {"day": 1.5},
+    {"consecutive": "3"},
+    {"consecutive": None},
+    {"consecutive": True},
+])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        AlertEngine().add_rule({**WINDY, "hours": None, **rule})
+
+
+@pytest.mark.parametrize("key", ["id", "field", "op", "value"])
+def test_rule_missing_key(key):
+    rule = dict(WINDY)
+    del rule[key]
+    with pytest.raises(ValueError):
+        AlertEngine().add_rule(rule)